@@ -1,7 +1,9 @@
 """Streamlit dashboard for Sorare MLS Limited Auctions."""
 
+import csv
 import os
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -30,27 +32,6 @@ def _format_price(value: float) -> str:
     return f"${value:,.2f}"
 
 
-def _compute_trend(prices: list[float]) -> str:
-    """Compute trend indicator comparing recent 3 auctions to overall average.
-
-    Returns:
-        A trend string: up-arrow, down-arrow, right-arrow, or dash.
-    """
-    valid = [p for p in prices if not pd.isna(p)]
-    if len(valid) < 4:
-        return "\u2014"  # em-dash
-    overall_avg = sum(valid) / len(valid)
-    recent_avg = sum(valid[-3:]) / 3
-    if overall_avg == 0:
-        return "\u2192"
-    ratio = (recent_avg - overall_avg) / overall_avg
-    if ratio > 0.05:
-        return "\u2191"
-    if ratio < -0.05:
-        return "\u2193"
-    return "\u2192"
-
-
 def _load_and_prepare(csv_path: str) -> pd.DataFrame | None:
     """Load a CSV file and prepare the display DataFrame.
 
@@ -59,61 +40,139 @@ def _load_and_prepare(csv_path: str) -> pd.DataFrame | None:
     if not os.path.isfile(csv_path):
         return None
 
-    df = pd.read_csv(csv_path)
-
-    # Identify ordinal price columns (everything after player, team)
-    price_cols = [c for c in df.columns if c not in ("player", "team")]
-
-    # Build the output rows
-    rows = []
-    for _, row in df.iterrows():
-        prices = [row[c] if c in row.index else float("nan") for c in price_cols]
-        valid_prices = [p for p in prices if not pd.isna(p)]
-
-        avg_price = sum(valid_prices) / len(valid_prices) if valid_prices else 0.0
-        trend = _compute_trend(prices)
-
-        out = {
-            "Player": row["player"],
-            "Team": row["team"],
+    # Identify ordinal price columns (everything after player, team) from the
+    # header, so every column can be parsed with an explicit dtype.
+    with open(csv_path, newline="") as f:
+        header = next(csv.reader(f), [])
+    price_cols = [c for c in header if c not in ("player", "team")]
+    dtype = {"player": "string", "team": "string"}
+    dtype.update(dict.fromkeys(price_cols, "float64"))
+
+    df = pd.read_csv(
+        csv_path,
+        dtype=dtype,
+        engine="c",
+        na_values=[""],
+        keep_default_na=False,
+    )
+
+    # Work on the whole price matrix at once: one row per player, oldest
+    # auction first, NaN-padded on the right for players with fewer auctions.
+    prices = df[price_cols].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(prices)
+    filled = np.where(valid, prices, 0.0)
+    counts = valid.sum(axis=1)
+    avg = np.where(counts > 0, filled.sum(axis=1) / np.maximum(counts, 1), 0.0)
+
+    # Trend: compare the 3 most recent auctions to the overall average.  The
+    # recent sum is a row-wise dot product with a mask of each row's last 3
+    # valid prices.
+    rank = np.cumsum(valid, axis=1)
+    recent = valid & (rank > (counts - 3)[:, None])
+    recent_avg = np.einsum("ij,ij->i", filled, recent) / 3
+    ratio = (recent_avg - avg) / np.where(avg == 0, np.nan, avg)
+    trend = np.select(
+        [counts < 4, avg == 0, ratio > 0.05, ratio < -0.05],
+        ["\u2014", "\u2192", "\u2191", "\u2193"],  # em-dash, right, up, down
+        default="\u2192",
+    )
+
+    result = pd.DataFrame(
+        {
+            "Player": df["player"].to_numpy(),
+            "Team": df["team"].to_numpy(),
             "Trend": trend,
-            "Avg Price": avg_price,
+            "Avg Price": avg,
         }
-        for col in price_cols:
-            val = row[col] if col in row.index else float("nan")
-            out[col] = val if not pd.isna(val) else None
-
-        rows.append(out)
-
-    result = pd.DataFrame(rows)
+    )
 
     # Sort by average price descending
-    result = result.sort_values("Avg Price", ascending=False).reset_index(drop=True)
+    result = result.sort_values("Avg Price", ascending=False)
+    prices = prices[result.index.to_numpy()]
+    result = result.reset_index(drop=True)
 
-    # Format prices for display
+    # Format prices for display, one pass over the whole matrix
     result["Avg Price"] = result["Avg Price"].apply(_format_price)
-    for col in price_cols:
-        if col in result.columns:
-            result[col] = result[col].apply(
-                lambda v: _format_price(v) if v is not None else ""
-            )
+    formatted = (
+        pd.Series(prices.ravel())
+        .map("${:,.2f}".format)
+        .to_numpy(dtype=object)
+        .reshape(prices.shape)
+    )
+    formatted[np.isnan(prices)] = ""
+    result = pd.concat([result, pd.DataFrame(formatted, columns=price_cols)], axis=1)
+
+    # Lower-cased copy of the player name for search, dropped before display
+    result["_player_lc"] = result["Player"].str.lower()
 
     return result
 
 
+@st.cache_data(show_spinner=False)
+def _load_and_prepare_cached(csv_path: str, mtime: float | None) -> pd.DataFrame | None:
+    """Cached wrapper around _load_and_prepare.
+
+    ``mtime`` is only part of the cache key: when fetch_auctions.py rewrites
+    the CSV its modification time changes and the entry is rebuilt.
+    """
+    return _load_and_prepare(csv_path)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _filter_players(
+    csv_path: str,
+    mtime: float | None,
+    teams: tuple[str, ...],
+    player_search: str,
+) -> pd.DataFrame:
+    """Return the rows of a prepared CSV matching the team and player filters."""
+    df = _load_and_prepare_cached(csv_path, mtime)
+
+    # Combine both filters into one boolean mask and slice once
+    mask = df["Team"].isin(teams)
+    if player_search:
+        query = player_search.lower()
+        mask &= df["_player_lc"].str.contains(query, regex=False, na=False)
+    return df.loc[mask.to_numpy(dtype=bool), df.columns.drop("_player_lc")]
+
+
+@st.cache_data(show_spinner=False)
+def _tab_meta(
+    csv_path: str, mtime: float | None
+) -> tuple[list[str], tuple[tuple[str, int], ...]] | None:
+    """Return the sorted team list and (column, width) pairs for a tab.
+
+    Returns None if there is no data to show.  Widths are returned as plain
+    tuples because column config objects cannot be cached.
+    """
+    df = _load_and_prepare_cached(csv_path, mtime)
+    if df is None or df.empty:
+        return None
+
+    teams = sorted(df["Team"].unique())
+    widths = {"Player": 180, "Team": 60, "Trend": 60, "Avg Price": 90}
+    # Narrow price columns
+    columns = tuple(
+        (col, widths.get(col, 80)) for col in df.columns if col != "_player_lc"
+    )
+    return teams, columns
+
+
 tab_objects = st.tabs(list(TABS.keys()))
 
 for tab, (label, filename) in zip(tab_objects, TABS.items()):
     with tab:
         csv_path = os.path.join(DATA_DIR, filename)
-        df = _load_and_prepare(csv_path)
-        if df is None or df.empty:
+        mtime = os.path.getmtime(csv_path) if os.path.isfile(csv_path) else None
+        meta = _tab_meta(csv_path, mtime)
+        if meta is None:
             st.warning("No data. Run fetch_auctions.py first.")
         else:
+            teams, column_widths = meta
+
             # Filters
             col1, col2 = st.columns(2)
             with col1:
-                teams = sorted(df["Team"].unique())
                 selected_teams = st.multiselect(
                     "Team", teams, default=teams, key=f"{label}_team"
                 )
@@ -122,22 +181,14 @@ for tab, (label, filename) in zip(tab_objects, TABS.items()):
                     "Player", placeholder="Search...", key=f"{label}_player"
                 )
 
-            filtered = df[df["Team"].isin(selected_teams)]
-            if player_search:
-                filtered = filtered[
-                    filtered["Player"].str.contains(player_search, case=False, na=False)
-                ]
+            filtered = _filter_players(
+                csv_path, mtime, tuple(selected_teams), player_search
+            )
 
             col_config = {
-                "Player": st.column_config.TextColumn(width=180),
-                "Team": st.column_config.TextColumn(width=60),
-                "Trend": st.column_config.TextColumn(width=60),
-                "Avg Price": st.column_config.TextColumn(width=90),
+                col: st.column_config.TextColumn(width=width)
+                for col, width in column_widths
             }
-            # Narrow price columns
-            for col in filtered.columns:
-                if col not in col_config:
-                    col_config[col] = st.column_config.TextColumn(width=80)
 
             st.dataframe(
                 filtered,
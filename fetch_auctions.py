@@ -6,30 +6,65 @@ TokenAuction history on Limited cards, then writes one CSV per position
 group into the data/ directory.
 
 Uses batched GraphQL queries with aliases to fetch multiple players per
-API call, reducing total requests by ~3x.
-
-Results are persisted in JSON files (data/history/*.json) so that
-repeated runs accumulate full history despite the API's per-request
-limit of ~20 results.
+API call.  The batch size adapts to the API's complexity limit: it is
+halved when a batch is rejected, grows after a run of successes, and the
+last good size is saved in data/.batch_size for the next run.  Batches are fetched
+concurrently from a thread pool; a shared rate limiter keeps the total
+within the unauthenticated API quota.
+
+Results are persisted in append-only NDJSON files (data/history/*.ndjson)
+so that repeated runs accumulate full history despite the API's
+per-request limit of ~20 results.  Run with --compact to rewrite them in
+date order and migrate any legacy data/history/*.json files.
+
+A run within REFRESH_TTL_SECONDS (env var, default 10 minutes) of the time
+in data/last_updated.txt exits without fetching unless --force is given.
 """
 
+import argparse
 import csv
-import json
+import functools
+import operator
 import os
 import re
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from itertools import pairwise
 
+import orjson
 import requests
 import yaml
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+# libyaml's C loader is much faster on large player lists; PyYAML builds
+# without libyaml only ship the pure-Python one.
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
 API_URL = "https://api.sorare.com/graphql"
 BATCH_SIZE = 20          # max results per player per API call
-PLAYERS_PER_BATCH = 3    # players per batched GraphQL request (conservative)
-SLEEP_SECONDS = 3        # stay within 20 calls/min unauthenticated limit
+FIRST_PAGE_SIZE = 5      # first page size when a player's history is known
+PLAYERS_PER_BATCH = 10   # initial players per batched GraphQL request
+MAX_PLAYERS_PER_BATCH = 20  # upper bound when growing the batch size
+GROW_AFTER = 3           # consecutive successful batches before growing
+BATCH_SIZE_NAME = ".batch_size"  # last good batch size, in data/
+MAX_CALLS_PER_MINUTE = 20  # unauthenticated API limit
+MAX_WORKERS = 4          # concurrent API requests in flight
+MIN_FETCH_INTERVAL = 15 * 60  # seconds before the same player is queried again
+MANIFEST_NAME = "_meta.json"  # per-player fetch bookkeeping in data/history/
+# Skip the whole run if data/last_updated.txt is younger than this (0 disables)
+REFRESH_TTL_SECONDS = int(os.environ.get("REFRESH_TTL_SECONDS", 10 * 60))
+LAST_UPDATED_FORMAT = "%Y-%m-%d %H:%M UTC"
 
 QUERY = """
 query GetLimitedAuctionHistory($playerSlug: String!, $first: Int, $to: ISO8601DateTime) {
@@ -67,31 +102,99 @@ TOKEN_PRICES_FIELDS = """
       }
 """
 
+# Sort key for (date, price) pairs.  ISO-8601 dates order correctly as
+# strings, so comparing only the date skips the tuple-level comparison.
+_BY_DATE = operator.itemgetter(0)
+
 POSITIONS = ["gk", "df", "mf", "fw"]
 
+# Trailing date suffix used in slugs for disambiguation (e.g. '-1998-09-01')
+_DATE_SUFFIX_RE = re.compile(r"-\d{4}-\d{2}-\d{2}$")
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+class RateLimiter:
+    """Allow at most ``max_calls`` calls per ``period`` seconds across threads.
+
+    Each call takes a token from a semaphore; a timer hands the token back
+    ``period`` seconds after the call finishes, so any window of ``period``
+    seconds contains at most ``max_calls`` calls.
+    """
+
+    def __init__(self, max_calls: int, period: float) -> None:
+        self._period = period
+        self._tokens = threading.Semaphore(max_calls)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __enter__(self) -> "RateLimiter":
+        self._tokens.acquire()
+        with self._lock:
+            self.calls += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        timer = threading.Timer(self._period, self._tokens.release)
+        timer.daemon = True
+        timer.start()
+
+
+LIMITER = RateLimiter(MAX_CALLS_PER_MINUTE, 60)
+
+# ---------------------------------------------------------------------------
+# HTTP session
+# ---------------------------------------------------------------------------
+
+# One pooled keep-alive session shared by all worker threads, so TCP/TLS
+# connections to the single API host are reused across requests (one
+# connection per worker).  The GraphQL queries are read-only, so POSTs are
+# safe to retry on throttling and server errors.  Responses are requested
+# compressed with every encoding urllib3 can decode here: gzip and deflate,
+# plus brotli when the brotli package is installed.
+SESSION = requests.Session()
+SESSION.headers.update(
+    {"Content-Type": "application/json", "Accept-Encoding": ACCEPT_ENCODING}
+)
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=MAX_WORKERS,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"POST"}),
+        ),
+    ),
+)
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=4096)
 def name_from_slug(slug: str) -> str:
     """Derive a display name from a slug like 'roman-celentano' -> 'Roman Celentano'.
 
     Strips trailing date suffixes used for disambiguation (e.g. '-1998-09-01').
     """
-    cleaned = re.sub(r"-\d{4}-\d{2}-\d{2}$", "", slug)
+    cleaned = _DATE_SUFFIX_RE.sub("", slug)
     return " ".join(part.capitalize() for part in cleaned.split("-"))
 
 
 def _has_complexity_error(body: dict) -> bool:
     """Return True if the API response contains a query-complexity error."""
-    for err in body.get("errors", []):
-        msg = err.get("message", "")
-        if "complexity" in msg.lower():
-            return True
-    return False
+    return any(
+        "complexity" in err.get("message", "").lower()
+        for err in body.get("errors", [])
+    )
 
 
-def build_batch_query(slugs: list[str]) -> str:
+@functools.lru_cache(maxsize=1024)
+def build_batch_query(slugs: tuple[str, ...]) -> str:
     """Build a single GraphQL query that fetches tokenPrices for multiple players
     using aliases (player0, player1, ...).
 
@@ -112,41 +215,47 @@ def build_batch_query(slugs: list[str]) -> str:
     return f"query {{\n  tokens {{\n{body}\n  }}\n}}"
 
 
-def _parse_token_prices(token_prices: list[dict]) -> list[tuple[str, float]]:
+def _parse_token_prices(
+    token_prices: list[dict],
+    stop_at: str | None = None,
+) -> list[tuple[str, float]]:
     """Extract (date, price_usd) tuples from a tokenPrices response list.
 
-    Only keeps TokenAuction deals (where deal.id is present).
+    Only keeps TokenAuction deals (where deal.id is present) newer than
+    ``stop_at``, the newest date already in the player's history.
     """
     results: list[tuple[str, float]] = []
     for tp in token_prices:
         deal = tp.get("deal")
         if deal and deal.get("id"):
-            usd_cents = tp["amounts"]["usdCents"]
             date = tp.get("date", "")
+            if stop_at is not None and date <= stop_at:
+                continue
+            usd_cents = tp["amounts"]["usdCents"]
             results.append((date, usd_cents / 100.0))
     return results
 
 
-def fetch_batch_auction_prices(slugs: list[str]) -> dict[str, list[tuple[str, float]] | None]:
+def fetch_batch_auction_prices(
+    slugs: list[str],
+    latest_known: dict[str, str | None] | None = None,
+) -> dict[str, list[tuple[str, float]] | None]:
     """Fetch auction prices for multiple players in a single batched API call.
 
-    Returns a dict mapping slug -> list of (date, price_usd) tuples.
+    Returns a dict mapping slug -> list of (date, price_usd) tuples, keeping
+    only auctions newer than the slug's ``latest_known`` date if given.
     If the batch fails due to complexity, returns None for all slugs
-    (signalling the caller should fall back to individual queries).
+    (signalling the caller should retry with a smaller batch).
     """
-    query = build_batch_query(slugs)
-    resp = requests.post(
-        API_URL,
-        json={"query": query},
-        headers={"Content-Type": "application/json"},
-        timeout=30,
-    )
+    query = build_batch_query(tuple(slugs))
+    with LIMITER:
+        resp = SESSION.post(API_URL, json={"query": query}, timeout=30)
     resp.raise_for_status()
-    body = resp.json()
+    body = orjson.loads(resp.content)
 
     # If complexity error, signal fallback
     if _has_complexity_error(body):
-        print("\n  [batch] Complexity error, falling back to individual queries")
+        print(f"\n  [batch] Complexity error for {len(slugs)} players, splitting batch")
         return {slug: None for slug in slugs}
 
     # Surface non-complexity errors
@@ -160,26 +269,139 @@ def fetch_batch_auction_prices(slugs: list[str]) -> dict[str, list[tuple[str, fl
     for i, slug in enumerate(slugs):
         alias = f"player{i}"
         token_prices = tokens.get(alias) or []
-        results[slug] = _parse_token_prices(token_prices)
+        stop_at = latest_known.get(slug) if latest_known else None
+        results[slug] = _parse_token_prices(token_prices, stop_at)
 
     return results
 
 
+def _legacy_history_path(path: str) -> str:
+    """Return the pre-NDJSON history path (a single JSON object) for ``path``."""
+    return os.path.splitext(path)[0] + ".json"
+
+
 def load_history(path: str) -> dict[str, float]:
-    """Load previously saved auction history {date: price} from JSON."""
+    """Load previously saved auction history {date: price}.
+
+    Reads the player's NDJSON file (one {"d": date, "p": price} record per
+    line), falling back to a legacy JSON object file.  The returned dict is
+    in chronological order; appended records are normally already in order,
+    so sorting is only needed after an out-of-order append.
+    """
     if os.path.isfile(path):
-        with open(path, "r") as f:
-            return json.load(f)
-    return {}
+        history: dict[str, float] = {}
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    print(f"\n  Skipping corrupt line in {path}", end=" ")
+                    continue
+                history[row["d"]] = row["p"]
+    else:
+        legacy_path = _legacy_history_path(path)
+        if not os.path.isfile(legacy_path):
+            return {}
+        with open(legacy_path, "rb") as f:
+            history = orjson.loads(f.read())
+
+    if any(a > b for a, b in pairwise(history)):
+        history = dict(sorted(history.items(), key=_BY_DATE))
+    return history
+
+
+def _history_lines(items) -> bytes:
+    """Encode (date, price) pairs as NDJSON records."""
+    return b"".join(orjson.dumps({"d": d, "p": p}) + b"\n" for d, p in items)
+
+
+def append_history(path: str, items: list[tuple[str, float]]) -> None:
+    """Append new auctions to a player's NDJSON history file.
+
+    Cost is proportional to the new records only, and each run's diff of the
+    committed file is just the appended lines.  If an interrupted append left
+    a partial last line, it is terminated first so the new records start on
+    a line of their own.
+    """
+    with open(path, "ab+") as f:
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        f.write(_history_lines(items))
 
 
 def save_history(path: str, history: dict[str, float]) -> None:
-    """Save auction history {date: price} to JSON."""
-    with open(path, "w") as f:
-        json.dump(history, f, indent=2)
+    """Rewrite a player's whole NDJSON history file in date order.
+
+    Writes to a temp file and renames it, so an interrupted run never
+    leaves a truncated history behind, then removes any legacy JSON file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_history_lines(sorted(history.items(), key=_BY_DATE)))
+    os.replace(tmp_path, path)
+
+    legacy_path = _legacy_history_path(path)
+    if os.path.isfile(legacy_path):
+        os.remove(legacy_path)
+
+
+@functools.lru_cache(maxsize=None)
+def load_players(path: str, mtime: float) -> dict:
+    """Parse players.yaml; cached per (path, mtime) so repeated calls in the
+    same process reuse the parsed result until the file changes."""
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=SafeLoader) or {}
+
+
+def load_manifest(path: str) -> dict[str, dict]:
+    """Load the fetch manifest {slug: {last_api_call, mtime}}."""
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    return {}
+
+
+def save_manifest(path: str, manifest: dict[str, dict]) -> None:
+    """Save the fetch manifest atomically (write to a temp file, then rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    os.replace(tmp_path, path)
+
+
+def _recently_fetched(entry: dict | None, history_path: str, now: float) -> bool:
+    """Return True if a player was queried within MIN_FETCH_INTERVAL and its
+    history file is unchanged since, so the API call can be skipped."""
+    if not entry or not os.path.isfile(history_path):
+        return False
+    if now - entry.get("last_api_call", 0) >= MIN_FETCH_INTERVAL:
+        return False
+    return os.path.getmtime(history_path) == entry.get("mtime")
 
 
-def fetch_auction_prices(slug: str) -> list[tuple[str, float]]:
+def _last_updated(ts_path: str) -> float | None:
+    """Return the time recorded in last_updated.txt as a Unix timestamp.
+
+    The file's contents are used rather than its mtime, which a fresh
+    checkout resets.
+    """
+    try:
+        with open(ts_path, "r") as f:
+            text = f.read().strip()
+    except FileNotFoundError:
+        return None
+    try:
+        updated = datetime.strptime(text, LAST_UPDATED_FORMAT)
+    except ValueError:
+        return None
+    return updated.replace(tzinfo=timezone.utc).timestamp()
+
+
+def fetch_auction_prices(slug: str, stop_at: str | None = None) -> list[tuple[str, float]]:
     """
     Return a list of (date, price_usd) tuples for a player's auctions,
     ordered most-recent-first.
@@ -188,31 +410,31 @@ def fetch_auction_prices(slug: str) -> list[tuple[str, float]]:
     take the oldest date, use it as ``to`` for the next call.  Stop when
     the batch returns empty, fewer results than BATCH_SIZE, or the API
     rejects the query due to complexity limits (unauthenticated access).
+
+    ``stop_at`` is the newest date already in the player's history: only
+    newer auctions are returned, and once a page reaches it, older pages
+    are already on disk and are not fetched.
+    The first page is then only FIRST_PAGE_SIZE results, which is usually
+    enough to cover the auctions since the last run.
     """
     results: list[tuple[str, float]] = []
     to_cursor: str | None = None
     prev_cursor: str | None = None
-    first_request = True
+    page_size = FIRST_PAGE_SIZE if stop_at is not None else BATCH_SIZE
 
     while True:
-        variables: dict = {"playerSlug": slug, "first": BATCH_SIZE}
+        variables: dict = {"playerSlug": slug, "first": page_size}
         if to_cursor is not None:
             variables["to"] = to_cursor
 
-        # Rate-limit: sleep before every request except the very first
-        # one for this player.
-        if not first_request:
-            time.sleep(SLEEP_SECONDS)
-        first_request = False
-
-        resp = requests.post(
-            API_URL,
-            json={"query": QUERY, "variables": variables},
-            headers={"Content-Type": "application/json"},
-            timeout=30,
-        )
+        with LIMITER:
+            resp = SESSION.post(
+                API_URL,
+                json={"query": QUERY, "variables": variables},
+                timeout=30,
+            )
         resp.raise_for_status()
-        body = resp.json()
+        body = orjson.loads(resp.content)
 
         # Complexity / other hard errors -- stop pagination gracefully.
         if _has_complexity_error(body):
@@ -233,9 +455,10 @@ def fetch_auction_prices(slug: str) -> list[tuple[str, float]]:
             # Only keep TokenAuction deals (deal.id is present)
             deal = tp.get("deal")
             if deal and deal.get("id"):
-                usd_cents = tp["amounts"]["usdCents"]
                 date = tp.get("date", "")
-                results.append((date, usd_cents / 100.0))
+                if stop_at is None or date > stop_at:
+                    usd_cents = tp["amounts"]["usdCents"]
+                    results.append((date, usd_cents / 100.0))
 
             # Track oldest date for pagination cursor
             d = tp.get("date")
@@ -244,9 +467,14 @@ def fetch_auction_prices(slug: str) -> list[tuple[str, float]]:
                     oldest_date = d
 
         # Stop if batch was smaller than requested (end of data)
-        if len(token_prices) < BATCH_SIZE:
+        if len(token_prices) < page_size:
             break
 
+        # Stop once we reach auctions already in the saved history
+        if stop_at is not None and oldest_date is not None and oldest_date <= stop_at:
+            break
+        page_size = BATCH_SIZE
+
         # Use the oldest date as the upper-bound for the next page
         if oldest_date is None:
             break
@@ -258,8 +486,8 @@ def fetch_auction_prices(slug: str) -> list[tuple[str, float]]:
     return results
 
 
-def ordinal(n: int) -> str:
-    """Return ordinal string for a 1-based index: 1 -> '1st', 2 -> '2nd', ..."""
+def _make_ordinal(n: int) -> str:
+    """Build the ordinal string for ``n``: 1 -> '1st', 2 -> '2nd', ..."""
     if 11 <= (n % 100) <= 13:
         suffix = "th"
     else:
@@ -267,119 +495,397 @@ def ordinal(n: int) -> str:
     return f"{n}{suffix}"
 
 
+# Precomputed CSV header ordinals, indexed by n (index 0 is unused).  Extended
+# on demand if a player ever has more auctions than this.
+_ORDINALS = [_make_ordinal(n) for n in range(1024)]
+
+
+def ordinals(count: int) -> list[str]:
+    """Return the ordinal strings for 1..count."""
+    while len(_ORDINALS) <= count:
+        _ORDINALS.append(_make_ordinal(len(_ORDINALS)))
+    return _ORDINALS[1:count + 1]
+
+
+def ordinal(n: int) -> str:
+    """Return ordinal string for a 1-based index: 1 -> '1st', 2 -> '2nd', ..."""
+    if 0 <= n < len(_ORDINALS):
+        return _ORDINALS[n]
+    return _make_ordinal(n)
+
+
+def _csv_field(value: str) -> str:
+    """Quote a text field the way csv.writer's QUOTE_MINIMAL would."""
+    if any(c in value for c in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _csv_roster(csv_path: str) -> list[tuple[str, str]] | None:
+    """Return the (player, team) pairs of an existing position CSV, in file
+    order, or None if it doesn't exist."""
+    if not os.path.isfile(csv_path):
+        return None
+    with open(csv_path, "r", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [(row[0], row[1]) for row in reader]
+
+
+def write_position_csv(csv_path: str, rows: list[tuple[str, str, list[float]]]) -> None:
+    """Write one position group's rows (display_name, team, [prices]) to CSV.
+
+    Players with fewer auctions get empty trailing cells.  Only the header
+    goes through csv.writer; prices never need quoting, so each data row is
+    joined and written as a single string.
+    """
+    # Determine max number of price columns across all players in group
+    max_prices = max((len(r[2]) for r in rows), default=0)
+
+    with open(csv_path, "w", newline="") as f:
+        csv.writer(f).writerow(["player", "team", *ordinals(max_prices)])
+        f.writelines(
+            ",".join([_csv_field(name), _csv_field(team), *map("{:.2f}".format, prices)])
+            + "," * (max_prices - len(prices))
+            + "\r\n"
+            for name, team, prices in rows
+        )
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
+def _history_path(history_dir: str, slug: str) -> str:
+    """Return the path of a player's history file."""
+    return os.path.join(history_dir, f"{slug}.ndjson")
+
+
 def _process_player_results(
     slug: str,
     team: str,
     new_auctions: list[tuple[str, float]],
+    history: dict[str, float],
     history_dir: str,
 ) -> tuple[str, str, list[float]]:
-    """Merge new auctions into history, save, and return a row tuple."""
-    history_path = os.path.join(history_dir, f"{slug}.json")
-    history = load_history(history_path)
-
-    new_count = 0
-    for date, price in new_auctions:
-        if date not in history:
-            new_count += 1
-        history[date] = price
+    """Merge new auctions into history, save it if anything was added, and
+    return a row tuple.
 
-    save_history(history_path, history)
+    ``history`` is kept in chronological order: new auctions are normally
+    newer than everything on disk and are simply appended; the dict is only
+    re-sorted when an older auction turns up.
+    """
+    history_path = _history_path(history_dir, slug)
+    latest = next(reversed(history), None)
 
-    sorted_prices = [price for _, price in sorted(history.items())]
+    incoming = dict(new_auctions)
+    new_items = sorted(
+        ((date, incoming[date]) for date in incoming.keys() - history.keys()),
+        key=_BY_DATE,
+    )
+    new_count = len(new_items)
+    out_of_order = bool(new_items) and latest is not None and new_items[0][0] < latest
+    history.update(new_items)
+
+    if out_of_order:
+        items = sorted(history.items(), key=_BY_DATE)
+        history.clear()
+        history.update(items)
+
+    # Append only the new records; a player without an NDJSON file yet
+    # (new, or still on the legacy JSON format) gets the whole history.
+    if new_count > 0:
+        if os.path.isfile(history_path):
+            append_history(history_path, new_items)
+        else:
+            save_history(history_path, history)
+
+    sorted_prices = list(history.values())
     print(f"{len(sorted_prices)} total auctions ({new_count} new)")
     return (name_from_slug(slug), team, sorted_prices)
 
 
-def main() -> None:
+class BatchSizer:
+    """Adaptive number of players per batched GraphQL request.
+
+    The size is halved when the API rejects a batch for complexity, and grows
+    by 2 after GROW_AFTER consecutive successful batches, never past the
+    smallest size rejected this run or MAX_PLAYERS_PER_BATCH.  The last size
+    that worked is saved so the next run starts from it; a run without
+    rejections never saves less than it started with.  Shared by all worker
+    threads.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, min(size, MAX_PLAYERS_PER_BATCH))
+        self._initial = self.size
+        self.last_good: int | None = None
+        self._rejected = False
+        self._ceiling = MAX_PLAYERS_PER_BATCH
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "BatchSizer":
+        """Create a sizer starting from the size saved by a previous run."""
+        size = PLAYERS_PER_BATCH
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                try:
+                    size = int(f.read().strip())
+                except ValueError:
+                    pass
+        return cls(size)
+
+    def save(self, path: str) -> None:
+        """Save the last known-good size (or the current one if none worked).
+
+        Small runs only send small batches, so without a rejection the size
+        this run started from is kept as a floor.
+        """
+        size = self.last_good or self.size
+        if not self._rejected:
+            size = max(size, self._initial)
+        with open(path, "w") as f:
+            f.write(f"{min(size, self._ceiling)}\n")
+
+    def shrink(self, failed_size: int) -> None:
+        """Record that a batch of ``failed_size`` players was rejected."""
+        with self._lock:
+            self._rejected = True
+            self._ceiling = max(1, min(self._ceiling, failed_size - 1))
+            self.size = max(1, min(self.size, failed_size // 2))
+            self._successes = 0
+
+    def record_success(self, size: int) -> None:
+        """Record that a batch of ``size`` players was accepted."""
+        with self._lock:
+            self.last_good = max(self.last_good or 0, size)
+            if size < self.size:
+                return
+            self._successes += 1
+            if self._successes >= GROW_AFTER:
+                self.size = min(self.size + 2, self._ceiling)
+                self._successes = 0
+
+
+def _fetch_batch(
+    slugs: list[str],
+    sizer: BatchSizer,
+    latest_known: dict[str, str | None],
+) -> dict[str, list[tuple[str, float]]]:
+    """Fetch new auctions for a batch of players.
+
+    Tries a single batched query first.  If the API rejects it for
+    complexity, the sizer shrinks and the same players are retried in
+    smaller batches, fetched concurrently (the shared rate limiter still
+    paces the calls); a single player that still fails falls back to an
+    individual query, which stops paginating at the player's
+    ``latest_known`` date.
+    """
+    batch_results = fetch_batch_auction_prices(slugs, latest_known)
+    if not any(v is None for v in batch_results.values()):
+        sizer.record_success(len(slugs))
+        return batch_results
+
+    if len(slugs) == 1:
+        slug = slugs[0]
+        print(f"  [fallback] Fetching {slug}...", flush=True)
+        return {slug: fetch_auction_prices(slug, stop_at=latest_known[slug])}
+
+    sizer.shrink(len(slugs))
+    size = min(sizer.size, len(slugs) - 1)
+    parts = [slugs[i:i + size] for i in range(0, len(slugs), size)]
+    results: dict[str, list[tuple[str, float]]] = {}
+    # A pool of its own: waiting on the main pool from one of its workers
+    # could deadlock once every worker is splitting a batch.
+    with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+        for part in executor.map(lambda p: _fetch_batch(p, sizer, latest_known), parts):
+            results.update(part)
+    return results
+
+
+def _fetch_worker(
+    pending: deque[str],
+    sizer: BatchSizer,
+    latest_known: dict[str, str | None],
+) -> dict[str, list[tuple[str, float]]]:
+    """Take batches of ``sizer.size`` players off ``pending`` and fetch them
+    until none are left.  Runs in a worker thread.
+
+    A batch whose request fails is logged and left out of the results, so
+    the rest of the run is still saved; its players are retried next run.
+    """
+    results: dict[str, list[tuple[str, float]]] = {}
+    while True:
+        batch: list[str] = []
+        size = sizer.size
+        while len(batch) < size:
+            try:
+                batch.append(pending.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return results
+        try:
+            results.update(_fetch_batch(batch, sizer, latest_known))
+        except requests.RequestException as e:
+            print(f"Failed batch [{', '.join(batch)}]: {e}", flush=True)
+            continue
+        print(f"Fetched batch [{', '.join(batch)}]", flush=True)
+
+
+def compact_histories(history_dir: str, slugs: list[str]) -> None:
+    """Rewrite each player's history file sorted and de-duplicated,
+    migrating legacy JSON files to NDJSON."""
+    for slug in slugs:
+        history_path = _history_path(history_dir, slug)
+        history = load_history(history_path)
+        if history:
+            save_history(history_path, history)
+    print(f"Compacted {len(slugs)} history files")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="rewrite history files in date order before fetching",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="fetch even if the data was refreshed within REFRESH_TTL_SECONDS",
+    )
+    args = parser.parse_args(argv)
+
     base_dir = os.path.dirname(os.path.abspath(__file__))
     players_path = os.path.join(base_dir, "players.yaml")
     data_dir = os.path.join(base_dir, "data")
     history_dir = os.path.join(data_dir, "history")
     os.makedirs(history_dir, exist_ok=True)
 
-    with open(players_path, "r") as f:
-        players_data = yaml.safe_load(f)
+    players_data = load_players(players_path, os.path.getmtime(players_path))
+
+    manifest_path = os.path.join(history_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
 
     start_time = time.time()
-    api_calls = 0
-    first_request = True
 
-    for pos in POSITIONS:
-        players = players_data.get(pos, [])
+    groups = {pos: players_data.get(pos) or [] for pos in POSITIONS}
+    all_players = [p for players in groups.values() for p in players]
+
+    if args.compact:
+        compact_histories(history_dir, [p["slug"] for p in all_players])
+
+    # A re-run shortly after a refresh (CI retry, overlapping cron) would only
+    # spend rate-limited calls on data that can barely have changed.
+    ts_path = os.path.join(data_dir, "last_updated.txt")
+    last_updated = _last_updated(ts_path)
+    if not args.force and last_updated is not None:
+        age = start_time - last_updated
+        if age < REFRESH_TTL_SECONDS:
+            print(f"Data refreshed {age / 60:.0f} min ago, skipping (use --force to fetch anyway)")
+            return
+
+    # Load saved histories first so fetches can stop at the newest auction
+    # already on disk.
+    histories = {
+        p["slug"]: load_history(_history_path(history_dir, p["slug"]))
+        for p in all_players
+    }
+    latest_known = {
+        slug: next(reversed(history), None) for slug, history in histories.items()
+    }
+
+    # Players queried within MIN_FETCH_INTERVAL whose history is unchanged
+    # since are served from disk without an API call.  ``histories`` is keyed
+    # by slug, so a player listed under several positions is fetched once.
+    fetch_slugs = [
+        slug for slug in histories
+        if not _recently_fetched(
+            manifest.get(slug), _history_path(history_dir, slug), start_time
+        )
+    ]
+    skipped = len(histories) - len(fetch_slugs)
+    if skipped:
+        print(f"Skipping {skipped} recently fetched players")
+
+    batch_size_path = os.path.join(data_dir, BATCH_SIZE_NAME)
+    sizer = BatchSizer.load(batch_size_path)
+
+    # Leaving the block also closes the session's pooled connections
+    with SESSION, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Workers pull batches for every position from one shared queue, so
+        # requests stay in flight across position boundaries and each batch
+        # uses the current adaptive size; the rate limiter paces the actual
+        # API calls.
+        pending = deque(fetch_slugs)
+        futures = [
+            executor.submit(_fetch_worker, pending, sizer, latest_known)
+            for _ in range(MAX_WORKERS)
+        ]
+        new_auctions: dict[str, list[tuple[str, float]]] = {}
+        for future in futures:
+            new_auctions.update(future.result())
+
+    if fetch_slugs:
+        sizer.save(batch_size_path)
+
+    # Decided before any merging: ``histories`` is shared across positions,
+    # so a player listed twice would only show new auctions the first time.
+    gained = {
+        slug for slug, auctions in new_auctions.items()
+        if any(date not in histories[slug] for date, _ in auctions)
+    }
+
+    csvs_written = 0
+    for pos, players in groups.items():
         if not players:
             continue
 
-        # Collect rows: each row is (display_name, team, [prices])
+        # Collect rows in players.yaml order: (display_name, team, [prices])
         rows: list[tuple[str, str, list[float]]] = []
-
-        # Process players in batches of PLAYERS_PER_BATCH
-        for batch_start in range(0, len(players), PLAYERS_PER_BATCH):
-            batch = players[batch_start:batch_start + PLAYERS_PER_BATCH]
-            batch_slugs = [p["slug"] for p in batch]
-
-            # Sleep between API calls (not between individual players)
-            if not first_request:
-                time.sleep(SLEEP_SECONDS)
-            first_request = False
-
-            print(f"Fetching batch [{', '.join(batch_slugs)}]...", flush=True)
-
-            # Try batched query first
-            batch_results = fetch_batch_auction_prices(batch_slugs)
-            api_calls += 1
-
-            # Check if batch failed (complexity error) -- fall back to individual
-            needs_fallback = any(v is None for v in batch_results.values())
-
-            if needs_fallback:
-                # Fall back to individual queries for this batch
-                for p in batch:
-                    slug = p["slug"]
-                    team = p["team"]
-                    time.sleep(SLEEP_SECONDS)
-                    print(f"  [fallback] Fetching {slug}...", end=" ", flush=True)
-                    new_auctions = fetch_auction_prices(slug)
-                    api_calls += 1
-                    rows.append(_process_player_results(slug, team, new_auctions, history_dir))
-            else:
-                # Process batched results
-                for p in batch:
-                    slug = p["slug"]
-                    team = p["team"]
-                    print(f"  {slug}...", end=" ", flush=True)
-                    new_auctions = batch_results[slug]
-                    rows.append(_process_player_results(slug, team, new_auctions, history_dir))
-
-        # Determine max number of price columns across all players in group
-        max_prices = max((len(r[2]) for r in rows), default=0)
-
-        # Build header
-        header = ["player", "team"]
-        header += [ordinal(n) for n in range(1, max_prices + 1)]
-
+        for p in players:
+            slug = p["slug"]
+            print(f"  {slug}...", end=" ", flush=True)
+            rows.append(
+                _process_player_results(
+                    slug, p["team"], new_auctions.get(slug, []), histories[slug], history_dir
+                )
+            )
+
+            entry = manifest.setdefault(slug, {})
+            if slug in new_auctions:
+                entry["last_api_call"] = start_time
+            history_path = _history_path(history_dir, slug)
+            if os.path.isfile(history_path):
+                entry["mtime"] = os.path.getmtime(history_path)
+
+        # Without new auctions the CSV only needs rewriting if the roster in
+        # players.yaml changed; leaving it untouched keeps its mtime, and so
+        # the dashboard's cache, valid.
         csv_path = os.path.join(data_dir, f"limited_{pos}.csv")
-        with open(csv_path, "w", newline="") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(header)
-            for name, team, prices in rows:
-                price_strs = [f"{p:.2f}" for p in prices]
-                # Pad with empty strings if this player has fewer prices
-                price_strs += [""] * (max_prices - len(price_strs))
-                writer.writerow([name, team] + price_strs)
-
+        changed = any(p["slug"] in gained for p in players)
+        if not changed and _csv_roster(csv_path) == [(r[0], r[1]) for r in rows]:
+            print(f"No changes, skipping {csv_path}")
+            continue
+        write_position_csv(csv_path, rows)
+        csvs_written += 1
         print(f"Wrote {csv_path}")
 
+    save_manifest(manifest_path, manifest)
+
     elapsed = time.time() - start_time
-    print(f"\nDone in {elapsed:.1f}s with {api_calls} API calls")
+    print(f"\nDone in {elapsed:.1f}s with {LIMITER.calls} API calls")
+
+    if not csvs_written:
+        return
 
     # Write last-updated timestamp
-    ts_path = os.path.join(data_dir, "last_updated.txt")
     with open(ts_path, "w") as f:
-        f.write(datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC"))
+        f.write(datetime.now(timezone.utc).strftime(LAST_UPDATED_FORMAT))
 
 
 if __name__ == "__main__":